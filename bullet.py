@@ -109,15 +109,21 @@ class Bullet:
     self.destroyed = True
 
 
-  def draw(self, screen: pygame.Surface):
+  def draw(self, screen: pygame.Surface, scale: float = 1):
     """
     Draws the bullet onto the game screen.
 
     Args:
     - screen: The surface to draw the bullet onto
+    - scale: The size of the screen relative to the logical resolution
     """
     if not self.destroyed:
-      screen.blit(self.sprite, self.rect)
+      if scale == 1:
+        screen.blit(self.sprite, self.rect)
+      else:
+        scaled_rect = pygame.Rect(0, 0, self.rect.width * scale, self.rect.height * scale)
+        scaled_rect.center = self.position * scale
+        screen.fill(pygame.Color(self.color), scaled_rect)
     else:
       # If the bullet is destroyed, draw a small explosion
-      pygame.draw.circle(screen, pygame.Color(self.explosion_color), self.position, 10)
+      pygame.draw.circle(screen, pygame.Color(self.explosion_color), self.position * scale, 10 * scale)
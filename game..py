@@ -1,6 +1,8 @@
+import time
+
 import pygame
 import numpy as np
-from typing import List
+from typing import Any, Callable, List, Optional, Tuple
 
 from tank import Tank
 from bullet import Bullet
@@ -10,13 +12,49 @@ class Game:
   """
   A class representing the game instance.
   """
-  def __init__(self):
-    # set fullscreen mode
-    self.screen = pygame.display.set_mode((0, 0), pygame.FULLSCREEN)
+  def __init__(self,
+      logical_resolution: Tuple[int, int] = (1920, 1080),
+      dynamic_resolution: bool = False,
+      frame_time_budget: float = 1000 / 60,
+      min_render_scale: float = 0.5):
+    """
+    Creates a new game instance.
+
+    The simulation runs at the fixed `logical_resolution`, so tank speed, spawn radius and collision masks do not depend on the display. Frames are drawn at `logical_resolution` times `render_scale` and scaled once to the display when presented, keeping the aspect ratio.
+
+    Args:
+    - logical_resolution: width and height of the game world in pixels
+    - dynamic_resolution: if True, lower the render scale while the frame time exceeds `frame_time_budget` and raise it again once frames are well within budget
+    - frame_time_budget: frame time in milliseconds above which the render scale is lowered
+    - min_render_scale: lowest render scale (fraction of the logical resolution) dynamic resolution may use
+    """
+    # set fullscreen mode once, the display mode is never changed afterwards
+    self.display = pygame.display.set_mode((0, 0), pygame.FULLSCREEN)
+    self.display.fill(pygame.Color("#000000"))
+    self.logical_size: Tuple[int, int] = logical_resolution
+    # fit the frame into the display keeping its aspect ratio, leaving black bars
+    fit = min(self.display.get_width() / logical_resolution[0], self.display.get_height() / logical_resolution[1])
+    self.present_rect = pygame.Rect(0, 0, int(logical_resolution[0] * fit), int(logical_resolution[1] * fit))
+    self.present_rect.center = self.display.get_rect().center
+    self.present_surface = self.display.subsurface(self.present_rect)
+    # dynamic resolution parameters
+    self.dynamic_resolution: bool = dynamic_resolution
+    self.frame_time_budget: float = frame_time_budget
+    self.min_render_scale: float = min_render_scale
+    self.render_scale: float = 1.0
+    self.render_scale_step: float = 0.1
+    self.frames_to_lower_scale: int = 60 # one second over budget
+    self.frames_to_raise_scale: int = 600 # ten seconds well within budget
+    self.budget_headroom: float = 0.7 # "well within budget" means below this fraction of it
+    self.avg_frame_time: float = 0.0
+    self.frames_over_budget: int = 0
+    self.frames_under_budget: int = 0
     self.tanks: List[Tank] = []
     self.bullets: List[Bullet] = []
-    self.controllers: List[Controller] = []
+    self.controllers: List[Any] = []
     self.clock = pygame.time.Clock()
+    # time source for gameplay timers, replaced by a simulated clock for deterministic replays
+    self.time_source: Callable[[], float] = time.time
     self.running = False
     self.max_players = 8
     self.player_colors = ["#33dd33", "#dd33dd", "#5588ff", "#dd8833", "#ffdd33", "#33ffdd", "#ff33dd", "#33ddff"]
@@ -24,7 +62,7 @@ class Game:
     self.init_game("map_1.png")
 
 
-  def init_game(self, map_path: str):
+  def init_game(self, map_path: str, controllers: Optional[List[Any]] = None):
     """
     Initializes the game:
     Create two tank objects, one for each player.
@@ -33,30 +71,35 @@ class Game:
 
     Args:
     - map_path (str): The path to the map image
+    - controllers (Optional[List[Any]]): Objects providing `get_inputs()` like `Controller`, one per player. If None, one Controller is created for each connected joystick.
     """
     # check if there are at least two controllers connected
     # if pygame.joystick.get_count() < 2:
     #   raise Exception("Not enough controllers connected!")
     self.map_mask = load_map(map_path)
-    # scale map to screen size
-    print(f"screen size: {self.screen.get_size()}")
-    self.map_mask = self.map_mask.scale(self.screen.get_size())
+    # scale map to the logical screen size
+    print(f"logical size: {self.logical_size}, display size: {self.display.get_size()}")
+    self.map_mask = self.map_mask.scale(self.logical_size)
     map_center: np.ndarray() = np.array(self.map_mask.get_size()) / 2
     self.map_mask.invert()
     self.map_image = self.map_mask.to_surface()
     self.map_mask.invert()
+    self.set_render_scale(self.render_scale)
     # reset variables
     self.tanks: List[Tank] = []
     self.bullets: List[Bullet] = []
-    self.controllers: List[Controller] = []
-    for controller_id in range(min(pygame.joystick.get_count(), self.max_players)):
+    if controllers is None:
+      controllers = [Controller(controller_id)
+          for controller_id in range(min(pygame.joystick.get_count(), self.max_players))]
+    self.controllers: List[Any] = controllers[:self.max_players]
+    for controller_id in range(len(self.controllers)):
       # place single placer in the center of the map
-      if pygame.joystick.get_count() == 1:
+      if len(self.controllers) == 1:
         angle = 0
         position = np.zeros(2) + map_center
       # otherwise distribute players evenly on a circle
       else:
-        angle = controller_id * 2 * np.pi / pygame.joystick.get_count()
+        angle = controller_id * 2 * np.pi / len(self.controllers)
         position = np.array([np.cos(angle), np.sin(angle)]) * 350 + map_center
       self.tanks.append(
         Tank(
@@ -66,13 +109,11 @@ class Game:
           bullet_color=self.bullet_colors[controller_id],
           health=100,
           max_health=100,
+          time_source=self.time_source,
         )
       )
       self.tanks[-1].draw(self.screen)
       self.tank_sprite_group = pygame.sprite.Group(*self.tanks)
-      # create controller
-      if controller_id < pygame.joystick.get_count():
-        self.controllers.append(Controller(controller_id))
 
 
   def handle_inputs(self, dt: float):
@@ -131,7 +172,7 @@ class Game:
       if bullet in self.bullets:
         self.bullets.remove(bullet)
         bullet.destroy()
-        bullet.draw(self.screen)
+        bullet.draw(self.screen, self.render_scale)
         del bullet
 
     for bullet in self.bullets:
@@ -161,17 +202,92 @@ class Game:
 
   def draw(self):
     for tank in self.tanks:
-      tank.draw(self.screen)
+      tank.draw(self.screen, self.render_scale)
 
     for bullet in self.bullets:
-      bullet.draw(self.screen)
+      bullet.draw(self.screen, self.render_scale)
 
     # for wall in self.walls:
     #   pygame.draw.rect(self.screen, (0, 0, 0), wall)
     
+    self.present()
+
+
+  def present(self):
+    """
+    Scale the rendered frame onto the display and show it.
+    """
+    if self.screen.get_size() == self.present_rect.size:
+      self.present_surface.blit(self.screen, (0, 0))
+    else:
+      pygame.transform.scale(self.screen, self.present_rect.size, self.present_surface)
     pygame.display.flip()
 
 
+  def set_render_scale(self, render_scale: float):
+    """
+    Create the render surface, the map image and the tank sprites for the given render scale.
+
+    Args:
+        render_scale (float): Size of the rendered frame as a fraction of the logical resolution
+    """
+    self.render_scale = render_scale
+    render_size = (
+        int(self.logical_size[0] * render_scale),
+        int(self.logical_size[1] * render_scale))
+    self.screen = pygame.Surface(render_size, 0, self.display)
+    if render_scale == 1:
+      self.render_map_image = self.map_image
+    else:
+      self.render_map_image = pygame.transform.scale(self.map_image, render_size)
+    for tank in self.tanks:
+      tank.scale_sprites(render_scale)
+
+
+  def adjust_render_scale(self, frame_time: float):
+    """
+    Lower the render scale if frames consistently take longer than the frame time budget, and raise it again once frames have stayed well within the budget for a while. Only drawing is affected, the simulation always runs at the logical resolution.
+
+    Args:
+        frame_time (float): Time spent on the last frame in milliseconds, excluding the frame rate limiter's delay
+    """
+    self.avg_frame_time = 0.9 * self.avg_frame_time + 0.1 * frame_time
+    if self.avg_frame_time > self.frame_time_budget:
+      self.frames_over_budget += 1
+      self.frames_under_budget = 0
+    elif self.avg_frame_time < self.budget_headroom * self.frame_time_budget:
+      self.frames_under_budget += 1
+      self.frames_over_budget = 0
+    else:
+      self.frames_over_budget = 0
+      self.frames_under_budget = 0
+
+    if self.frames_over_budget >= self.frames_to_lower_scale and self.render_scale > self.min_render_scale:
+      new_scale = max(self.min_render_scale, round(self.render_scale - self.render_scale_step, 2))
+    elif self.frames_under_budget >= self.frames_to_raise_scale and self.render_scale < 1:
+      new_scale = min(1.0, round(self.render_scale + self.render_scale_step, 2))
+    else:
+      return
+    print(f"average frame time {self.avg_frame_time:.1f}ms, changing render scale to {new_scale:.1f}")
+    self.set_render_scale(new_scale)
+    self.frames_over_budget = 0
+    self.frames_under_budget = 0
+
+
+  def step(self, dt: float):
+    """
+    Advance the game by one frame: draw the map, process inputs, update the game state and draw the frame.
+
+    Args:
+        dt (float): Time since last frame in seconds
+    """
+    # draw map
+    self.screen.blit(self.render_map_image, (0, 0))
+    self.handle_inputs(dt)
+    self.update(dt)
+    self.draw()
+
+
   def run(self):
     self.running = True
     # bind ESC key to quit
@@ -179,12 +295,9 @@ class Game:
     
     while self.running: # main game loop
       dt = self.clock.tick(60) / 1000.0
-      
-      # draw map
-      self.screen.blit(self.map_image, (0, 0))
-      self.handle_inputs(dt)
-      self.update(dt)
-      self.draw()
+      self.step(dt)
+      if self.dynamic_resolution:
+        self.adjust_render_scale(self.clock.get_rawtime())
     
     pygame.quit()
 
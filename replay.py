@@ -0,0 +1,526 @@
+"""
+Headless deterministic replay harness for the game logic.
+
+Runs fixed scenarios (seeded random or scripted controller inputs on `map_1.png`) with a fixed time step and a simulated clock. After every tick it records a hash of the simulation state, a hash of the rendered frame and the time the tick took. Recorded traces are stored as golden files in `replays/`, together with counts of the collision events each scenario covers. Checking compares a new run against the golden traces and fails on the first diverging tick.
+
+Each scenario is run `--repeat` times and timed by the lowest median tick time of these runs. Timing against a golden trace is only meaningful if the golden was recorded on the same machine. To measure an optimization, use `compare`, which times a git revision and the working tree back to back in the same process.
+
+Usage:
+  python replay.py record [scenario ...]                  # (re)create golden traces
+  python replay.py check [scenario ...]                   # compare against golden traces
+  python replay.py compare [--baseline REF] [scenario ...] # compare against a git revision (default HEAD)
+"""
+import argparse
+import collections
+import contextlib
+import hashlib
+import importlib.util
+import io
+import json
+import os
+import subprocess
+import sys
+import tarfile
+import tempfile
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+# run without a window or audio device
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import numpy as np
+import pygame
+
+REPO_DIR: str = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, REPO_DIR)
+
+from bullet import Bullet
+from tank import Tank
+
+REPLAY_DIR: str = os.path.join(REPO_DIR, "replays")
+MAP_PATH: str = os.path.join(REPO_DIR, "map_1.png")
+LOGICAL_RESOLUTION: Tuple[int, int] = (1920, 1080)
+DT: float = 1 / 60
+
+
+class RandomController:
+  """
+  A controller replaying a pseudo-random input sequence generated from a seed. Provides the same `get_inputs()` interface as `Controller`.
+  """
+  def __init__(self, seed: int, hold_ticks: int = 30):
+    """
+    Creates a new random controller.
+
+    Args:
+    - seed: Seed of the random number generator producing the inputs
+    - hold_ticks: Number of ticks each input is held before a new one is chosen
+    """
+    self.rng = np.random.default_rng(seed)
+    self.hold_ticks: int = hold_ticks
+    self.tick: int = 0
+    self.inputs: dict = None
+
+
+  def get_inputs(self) -> dict:
+    """
+    Returns the input for the current tick in the format of `Controller.get_inputs()`.
+    """
+    if self.tick % self.hold_ticks == 0:
+      move_direction = self.rng.uniform(-1, 1, 2)
+      turret_direction = self.rng.uniform(-1, 1, 2)
+      self.inputs = {
+        # leave sticks in the deadzone now and then, like a real player
+        "move_direction": move_direction if self.rng.random() > 0.2 else None,
+        "turret_direction": turret_direction if self.rng.random() > 0.2 else None,
+        "fire": bool(self.rng.random() > 0.5),
+      }
+    self.tick += 1
+    return self.inputs
+
+
+class ScriptedController:
+  """
+  A controller replaying a fixed sequence of inputs. Provides the same `get_inputs()` interface as `Controller`.
+  """
+  def __init__(self, script: List[Tuple[int, Optional[Tuple[float, float]], Optional[Tuple[float, float]], bool]]):
+    """
+    Creates a new scripted controller.
+
+    Args:
+    - script: List of segments `(ticks, move_direction, turret_direction, fire)`. Each segment's input is held for `ticks` ticks. After the last segment, its input is held.
+    """
+    self.inputs: List[dict] = []
+    for ticks, move_direction, turret_direction, fire in script:
+      inputs = {
+        "move_direction": None if move_direction is None else np.array(move_direction, dtype=float),
+        "turret_direction": None if turret_direction is None else np.array(turret_direction, dtype=float),
+        "fire": fire,
+      }
+      self.inputs += [inputs] * ticks
+    self.tick: int = 0
+
+
+  def get_inputs(self) -> dict:
+    """
+    Returns the input for the current tick in the format of `Controller.get_inputs()`.
+    """
+    inputs = self.inputs[min(self.tick, len(self.inputs) - 1)]
+    self.tick += 1
+    return inputs
+
+
+def random_players(seed: int, n_players: int) -> Callable[[], list]:
+  return lambda: [RandomController(seed * 1000 + i) for i in range(n_players)]
+
+
+def showdown_players() -> list:
+  """
+  Two tanks spawned back to back on a clear line through the map center, aiming at each other:
+  - both fire, so their bullets meet head-on (bullet-bullet hits)
+  - only the left tank fires, hitting the right tank several times
+  - both reverse into each other (tank-tank contact) while firing
+  """
+  return [
+    # right tank, aiming left
+    ScriptedController([
+      (150, None, (-1, 0), True),
+      (200, None, (-1, 0), False),
+      (250, (0, -1), (-1, 0), True),
+    ]),
+    # left tank, aiming right
+    ScriptedController([
+      (150, None, (1, 0), True),
+      (200, None, (1, 0), True),
+      (250, (0, -1), (1, 0), True),
+    ]),
+  ]
+
+
+def expiry_players() -> list:
+  """
+  Two tanks drive apart until they are further apart than a bullet's range, then each fires a single bullet at the other. The left tank fires so that its bullet meets the right tank's bullet in the tick it has run out of range and is destroyed, which adds that bullet to `hit_bullets` twice.
+  """
+  return [
+    # right tank, aiming left
+    ScriptedController([
+      (60, (0, 1), (-1, 0), False),
+      (1, None, (-1, 0), True),
+      (300, None, (-1, 0), False),
+    ]),
+    # left tank, aiming right
+    ScriptedController([
+      (60, (0, 1), (1, 0), False),
+      (135, None, (1, 0), False),
+      (1, None, (1, 0), True),
+      (300, None, (1, 0), False),
+    ]),
+  ]
+
+
+# name -> (function creating one controller per player, number of ticks)
+SCENARIOS: Dict[str, Tuple[Callable[[], list], int]] = {
+  "solo": (random_players(1, 1), 600),
+  "duel": (random_players(2, 2), 900),
+  "four_players": (random_players(3, 4), 900),
+  "eight_players": (random_players(4, 8), 900),
+  "showdown": (showdown_players, 600),
+  "expiry": (expiry_players, 300),
+}
+
+
+def load_game_module(source_dir: str = REPO_DIR):
+  """
+  Import the game module from `game..py`, which cannot be imported by name.
+
+  Args:
+      source_dir (str): Directory containing the game sources. For directories other than the repository, the game's own `bullet`, `tank` and `controller` modules are imported from there, without replacing the ones used by this harness.
+  """
+  isolated_modules = ("bullet", "tank", "controller")
+  if source_dir != REPO_DIR:
+    saved_modules = {name: sys.modules.pop(name) for name in isolated_modules if name in sys.modules}
+    sys.path.insert(0, source_dir)
+  try:
+    spec = importlib.util.spec_from_file_location("game", os.path.join(source_dir, "game..py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+  finally:
+    if source_dir != REPO_DIR:
+      sys.path.remove(source_dir)
+      for name in isolated_modules:
+        sys.modules.pop(name, None)
+      sys.modules.update(saved_modules)
+  return module
+
+
+def state_hash(game) -> str:
+  """
+  Hash the simulation state: tanks and bullets.
+
+  Args:
+      game (Game): The game to hash
+
+  Returns:
+      str: A short hex digest of the state
+  """
+  state = hashlib.sha1()
+  for tank in game.tanks:
+    state.update(np.asarray(tank.position, dtype=np.float64).tobytes())
+    state.update(np.array([tank.rotation, tank.turret_rotation, tank.health], dtype=np.float64).tobytes())
+  for bullet in game.bullets:
+    state.update(np.asarray(bullet.position, dtype=np.float64).tobytes())
+    state.update(bytes([bullet.destroyed]))
+  return state.hexdigest()[:16]
+
+
+def frame_hash(game) -> str:
+  """
+  Hash the rendered frame.
+
+  Args:
+      game (Game): The game to hash
+
+  Returns:
+      str: A short hex digest of the frame
+  """
+  return hashlib.sha1(pygame.image.tobytes(game.screen, "RGB")).hexdigest()[:16]
+
+
+@contextlib.contextmanager
+def count_events(events: collections.Counter):
+  """
+  Count the collision events of `Game.update` while active, by wrapping the collision checks it calls. Every detected bullet collision adds the bullet to `hit_bullets`. The only other append is for bullets that are already destroyed, which the caller has to count before each tick.
+
+  Args:
+      events (collections.Counter): Counter to add the events to
+
+  Yields:
+      collections.Counter: Appends to `hit_bullets` per bullet id, to be evaluated and cleared after every tick
+  """
+  appends_per_bullet = collections.Counter()
+  hits_per_tank = collections.Counter()
+  originals = {
+    (Bullet, "detect_bullet_collision"): Bullet.detect_bullet_collision,
+    (Bullet, "detect_tank_collision"): Bullet.detect_tank_collision,
+    (Bullet, "detect_wall_collision"): Bullet.detect_wall_collision,
+    (Tank, "detect_tank_collision"): Tank.detect_tank_collision,
+  }
+
+  def bullet_bullet(bullet, other):
+    hit = originals[Bullet, "detect_bullet_collision"](bullet, other)
+    if hit:
+      events["bullet_bullet_hits"] += 1
+      appends_per_bullet[id(bullet)] += 1
+      appends_per_bullet[id(other)] += 1
+    return hit
+
+  def bullet_tank(bullet, tank):
+    hit = originals[Bullet, "detect_tank_collision"](bullet, tank)
+    if hit:
+      events["bullet_tank_hits"] += 1
+      appends_per_bullet[id(bullet)] += 1
+      hits_per_tank[id(tank)] += 1
+    return hit
+
+  def bullet_wall(bullet, wall_mask):
+    hit = originals[Bullet, "detect_wall_collision"](bullet, wall_mask)
+    if hit:
+      events["bullet_wall_hits"] += 1
+      appends_per_bullet[id(bullet)] += 1
+    return hit
+
+  def tank_tank(tank, other_tank):
+    hit = originals[Tank, "detect_tank_collision"](tank, other_tank)
+    if hit:
+      events["tank_tank_contacts"] += 1
+    return hit
+
+  Bullet.detect_bullet_collision = bullet_bullet
+  Bullet.detect_tank_collision = bullet_tank
+  Bullet.detect_wall_collision = bullet_wall
+  Tank.detect_tank_collision = tank_tank
+  try:
+    yield appends_per_bullet
+  finally:
+    for (cls, name), method in originals.items():
+      setattr(cls, name, method)
+    events["max_hits_on_one_tank"] = max(hits_per_tank.values(), default=0)
+
+
+def run_scenario(game_module, name: str, events: collections.Counter = None, hashes: bool = True) -> Tuple[List[str], List[str], List[float]]:
+  """
+  Run a scenario headless with a fixed time step.
+
+  Args:
+      game_module: The imported game module
+      name (str): Name of the scenario in `SCENARIOS`
+      events (collections.Counter): If given, count collision events into it. This slows down the ticks.
+      hashes (bool): If False, skip hashing and only measure the tick times
+
+  Returns:
+      List[str]: Simulation state hash after each tick
+      List[str]: Rendered frame hash after each tick
+      List[float]: Wall time of each tick in milliseconds, excluding hashing
+  """
+  make_controllers, n_ticks = SCENARIOS[name]
+  sim_time = [0.0]
+  # silence the game's debug prints
+  with contextlib.redirect_stdout(io.StringIO()):
+    game = game_module.Game(logical_resolution=LOGICAL_RESOLUTION)
+    game.time_source = lambda: sim_time[0]
+    game.init_game(MAP_PATH, controllers=make_controllers())
+  game.running = True
+
+  state_hashes: List[str] = []
+  frame_hashes: List[str] = []
+  tick_times: List[float] = []
+  counting = count_events(events) if events is not None else contextlib.nullcontext()
+  with counting as appends_per_bullet:
+    for _ in range(n_ticks):
+      if appends_per_bullet is not None:
+        # `Game.update` adds bullets destroyed by `Bullet.move` to `hit_bullets` without a collision check
+        for bullet in game.bullets:
+          if bullet.destroyed:
+            appends_per_bullet[id(bullet)] += 1
+      start = time.perf_counter()
+      game.step(DT)
+      tick_times.append((time.perf_counter() - start) * 1000)
+      sim_time[0] += DT
+      if hashes:
+        state_hashes.append(state_hash(game))
+        frame_hashes.append(frame_hash(game))
+      if appends_per_bullet is not None:
+        events["repeated_hit_bullet_appends"] += sum(hits - 1 for hits in appends_per_bullet.values() if hits > 1)
+        appends_per_bullet.clear()
+  return state_hashes, frame_hashes, tick_times
+
+
+def timed_runs(game_module, name: str, repeat: int) -> Tuple[List[str], List[str], List[float]]:
+  """
+  Run a scenario `repeat` times, hashing only the first run.
+
+  Returns:
+      List[str]: Simulation state hash after each tick of the first run
+      List[str]: Rendered frame hash after each tick of the first run
+      List[float]: Tick times of the run with the lowest median tick time
+  """
+  state_hashes, frame_hashes, best_tick_times = run_scenario(game_module, name)
+  for _ in range(repeat - 1):
+    _, _, tick_times = run_scenario(game_module, name, hashes=False)
+    if np.median(tick_times) < np.median(best_tick_times):
+      best_tick_times = tick_times
+  return state_hashes, frame_hashes, best_tick_times
+
+
+def versions() -> Dict[str, str]:
+  return {
+    "pygame": pygame.version.ver,
+    "sdl": ".".join(str(part) for part in pygame.get_sdl_version()),
+  }
+
+
+def golden_path(name: str) -> str:
+  return os.path.join(REPLAY_DIR, f"{name}.json")
+
+
+def first_divergence(new: List[str], old: List[str]) -> Optional[int]:
+  """
+  Returns the first tick at which the two traces differ, or None if they are identical.
+  """
+  for tick, (new_hash, old_hash) in enumerate(zip(new, old)):
+    if new_hash != old_hash:
+      return tick
+  if len(new) != len(old):
+    return min(len(new), len(old))
+  return None
+
+
+def divergence(state_hashes: List[str], frame_hashes: List[str], reference_state_hashes: List[str], reference_frame_hashes: List[str]) -> Optional[str]:
+  """
+  Describe where a run first diverges from a reference run.
+
+  Returns:
+      Optional[str]: A description of the first divergence, or None if the runs match
+  """
+  state_tick = first_divergence(state_hashes, reference_state_hashes)
+  if state_tick is not None:
+    return f"simulation state diverged at tick {state_tick}"
+  frame_tick = first_divergence(frame_hashes, reference_frame_hashes)
+  if frame_tick is not None:
+    return f"simulation state matches but rendered frame diverged at tick {frame_tick}"
+  return None
+
+
+def timing_delta(median_time: float, reference_time: float, reference: str) -> str:
+  delta = (median_time - reference_time) / reference_time * 100
+  return f"median tick time {median_time:.3f}ms ({reference} {reference_time:.3f}ms, {delta:+.1f}%)"
+
+
+def record(game_module, names: List[str], repeat: int) -> bool:
+  """
+  Run the given scenarios and store their traces as golden files. Each scenario is run once more to count collision events, which also verifies that it replays deterministically.
+
+  Returns:
+      bool: True if all scenarios were recorded, False if any did not replay deterministically
+  """
+  os.makedirs(REPLAY_DIR, exist_ok=True)
+  all_recorded = True
+  for name in names:
+    state_hashes, frame_hashes, tick_times = timed_runs(game_module, name, repeat)
+    events = collections.Counter()
+    second_state_hashes, second_frame_hashes, _ = run_scenario(game_module, name, events)
+    if second_state_hashes != state_hashes or second_frame_hashes != frame_hashes:
+      all_recorded = False
+      print(f"{name}: NOT RECORDED, two runs of the scenario differ")
+      continue
+    with open(golden_path(name), "w") as file:
+      json.dump({
+        "versions": versions(),
+        "ticks": len(state_hashes),
+        "events": dict(sorted(events.items())),
+        "state_hashes": state_hashes,
+        "frame_hashes": frame_hashes,
+        "repeat": repeat,
+        "median_tick_time_ms": round(float(np.median(tick_times)), 4),
+        "tick_times_ms": [round(t, 3) for t in tick_times],
+      }, file, indent=1)
+    event_summary = ", ".join(f"{event} {count}" for event, count in sorted(events.items()))
+    print(f"{name}: recorded {len(state_hashes)} ticks, median tick time {np.median(tick_times):.3f}ms (best of {repeat} runs), {event_summary}")
+  return all_recorded
+
+
+def check(game_module, names: List[str], repeat: int) -> bool:
+  """
+  Run the given scenarios and compare them against their golden traces. The timing difference is only meaningful if the golden traces were recorded on this machine.
+
+  Returns:
+      bool: True if all scenarios match their golden traces, False otherwise
+  """
+  all_match = True
+  for name in names:
+    if not os.path.exists(golden_path(name)):
+      all_match = False
+      print(f"{name}: FAILED, no golden trace, run `python replay.py record {name}` first")
+      continue
+    with open(golden_path(name)) as file:
+      golden = json.load(file)
+    if golden["versions"] != versions():
+      print(f"{name}: warning, golden recorded with {golden['versions']}, running {versions()}. Rendered frames may differ.")
+    state_hashes, frame_hashes, tick_times = timed_runs(game_module, name, repeat)
+    timing = timing_delta(float(np.median(tick_times)), golden["median_tick_time_ms"], "golden")
+    diverged = divergence(state_hashes, frame_hashes, golden["state_hashes"], golden["frame_hashes"])
+    if diverged is not None:
+      all_match = False
+      print(f"{name}: FAILED, {diverged}, {timing}")
+    else:
+      print(f"{name}: ok, {timing}")
+  return all_match
+
+
+def compare(game_module, baseline_module, names: List[str], repeat: int) -> bool:
+  """
+  Run the given scenarios with the baseline and the current game back to back, alternating which runs first, and compare their traces and tick times.
+
+  Returns:
+      bool: True if all scenarios behave identically in both versions, False otherwise
+  """
+  all_match = True
+  for name in names:
+    baseline_state_hashes, baseline_frame_hashes, _ = run_scenario(baseline_module, name)
+    state_hashes, frame_hashes, _ = run_scenario(game_module, name)
+    medians = {baseline_module: [], game_module: []}
+    for i in range(repeat):
+      # alternate the order so slow drift of the machine affects both versions alike
+      order = [baseline_module, game_module] if i % 2 == 0 else [game_module, baseline_module]
+      for module in order:
+        _, _, tick_times = run_scenario(module, name, hashes=False)
+        medians[module].append(np.median(tick_times))
+    timing = timing_delta(float(min(medians[game_module])), float(min(medians[baseline_module])), "baseline")
+    diverged = divergence(state_hashes, frame_hashes, baseline_state_hashes, baseline_frame_hashes)
+    if diverged is not None:
+      all_match = False
+      print(f"{name}: FAILED, {diverged}, {timing}")
+    else:
+      print(f"{name}: ok, {timing}")
+  return all_match
+
+
+def export_revision(revision: str, target_dir: str):
+  """
+  Extract the files of a git revision of this repository into `target_dir`.
+  """
+  archive = subprocess.run(["git", "archive", revision], cwd=REPO_DIR, stdout=subprocess.PIPE, check=True).stdout
+  with tarfile.open(fileobj=io.BytesIO(archive)) as tar:
+    tar.extractall(target_dir)
+
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+  parser.add_argument("mode", choices=["record", "check", "compare"])
+  parser.add_argument("scenarios", nargs="*", help=f"scenarios to run (default: all of {', '.join(SCENARIOS)})")
+  parser.add_argument("--repeat", type=int, default=5, help="number of timed runs per scenario (default: 5)")
+  parser.add_argument("--baseline", default="HEAD", help="git revision to compare against in compare mode (default: HEAD)")
+  args = parser.parse_intermixed_args()
+  names = args.scenarios or list(SCENARIOS)
+  unknown = [name for name in names if name not in SCENARIOS]
+  if unknown:
+    parser.error(f"unknown scenarios: {', '.join(unknown)}. Available: {', '.join(SCENARIOS)}")
+  if args.repeat < 1:
+    parser.error("--repeat must be at least 1")
+  # `Game.__init__` loads the map by relative path
+  os.chdir(REPO_DIR)
+  pygame.init()
+  game_module = load_game_module()
+  if args.mode == "record":
+    success = record(game_module, names, args.repeat)
+  elif args.mode == "check":
+    success = check(game_module, names, args.repeat)
+  else:
+    with tempfile.TemporaryDirectory() as baseline_dir:
+      export_revision(args.baseline, baseline_dir)
+      baseline_module = load_game_module(baseline_dir)
+      if not hasattr(baseline_module.Game, "step"):
+        parser.error(f"baseline {args.baseline} predates `Game.step` and cannot be replayed")
+      success = compare(game_module, baseline_module, names, args.repeat)
+  if not success:
+    sys.exit(1)
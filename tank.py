@@ -1,5 +1,7 @@
 import time
 
+from typing import Callable
+
 import numpy as np
 import pygame
 
@@ -20,7 +22,8 @@ class Tank(pygame.sprite.Sprite):
                fire_cooldown: float = 0.5,
                health: int = 100,
                max_health: int = 100,
-               name: str=""):
+               name: str="",
+               time_source: Callable[[], float] = time.time):
     """
     Creates a new tank object.
 
@@ -31,6 +34,7 @@ class Tank(pygame.sprite.Sprite):
     - velocity: A tuple of x and y components representing the tank's velocity
     - health: An integer representing the tank's remaining health
     - max_health: An integer representing the tank's maximum health
+    - time_source: A function returning the current time in seconds, used for the fire cooldown
     """
     super().__init__()
     self.position: np.ndarray = position
@@ -50,8 +54,9 @@ class Tank(pygame.sprite.Sprite):
     self.new_rotation: float = self.rotation
     self.new_turret_rotation: float =self.turret_rotation
     # gameplay parameters
+    self.time_source: Callable[[], float] = time_source
     self.fire_cooldown: float = fire_cooldown
-    self.last_fired: float = time.time()
+    self.last_fired: float = self.time_source()
     self.bullet_damage: int = 10
     self.health: int = health
     self.max_health: int = max_health
@@ -66,6 +71,9 @@ class Tank(pygame.sprite.Sprite):
     self.health_bar_y_offset: int = self.tank_length//2# + self.health_bar_height
     # self.fire_sound: pygame.mixer.Sound = pygame.mixer.Sound("sounds/mixkit-cinematic-laser-swoosh-1467.wav")
     self.create_sprite()
+    # sprites scaled for drawing, updated when the draw scale changes
+    self.draw_scale: float = 1
+    self.scaled_turret_image: pygame.Surface = self.turret_image
 
 
   def update_movement(self, move_direction: np.ndarray, dt: float):
@@ -128,9 +136,9 @@ class Tank(pygame.sprite.Sprite):
     Returns:
         Bullet: A bullet object if the tank can fire, None otherwise.
     """
-    if time.time() - self.last_fired < self.fire_cooldown:
+    if self.time_source() - self.last_fired < self.fire_cooldown:
       return None
-    self.last_fired: float = time.time()
+    self.last_fired: float = self.time_source()
     # calculate bullet velocity from turret rotation
     cannon_direction = np.array([np.cos(np.deg2rad(self.turret_rotation)), -np.sin(np.deg2rad(self.turret_rotation))])
     bullet_velocity: np.ndarray =  cannon_direction * 300 + self.velocity
@@ -233,51 +241,79 @@ class Tank(pygame.sprite.Sprite):
     
 
 
-  def draw(self, screen: pygame.Surface):
+  def scale_sprites(self, scale: float):
+    """
+    Create the scaled sprites used for drawing at the given scale.
+
+    Args:
+        scale (float): The size of the screen relative to the logical resolution
+    """
+    self.draw_scale = scale
+    if scale == 1:
+      self.scaled_turret_image = self.turret_image
+    else:
+      self.scaled_turret_image = pygame.transform.rotozoom(self.turret_image, 0, scale)
+
+
+  def draw(self, screen: pygame.Surface, scale: float = 1):
     """
     Draw the tank and its turret onto the game screen.
+
+    Args:
+        screen (pygame.Surface): The surface to draw the tank onto
+        scale (float): The size of the screen relative to the logical resolution
     """
     # move tank image
     self.rect.center = self.position
+    center = np.array(self.rect.center) * scale
+    if scale != self.draw_scale:
+      self.scale_sprites(scale)
+    turret_image = self.scaled_turret_image
+    if scale == 1:
+      rotate = pygame.transform.rotate
+    else:
+      rotate = lambda image, angle: pygame.transform.rotozoom(image, angle, scale)
     # rotate tank image
-    rotated_tank_image = pygame.transform.rotate(self.image, self.rotation)
+    rotated_tank_image = rotate(self.image, self.rotation)
     # rotate the cannon image
-    rotated_cannon_image = pygame.transform.rotate(self.cannon_image, self.turret_rotation)
+    rotated_cannon_image = rotate(self.cannon_image, self.turret_rotation)
     
     # move and rotate tank
-    rotated_tank_rect = rotated_tank_image.get_rect(center=self.rect.center)
+    rotated_tank_rect = rotated_tank_image.get_rect(center=center)
     screen.blit(rotated_tank_image, rotated_tank_rect)
     # move turret
     tank_front = np.array([np.cos(np.deg2rad(self.rotation)), -np.sin(np.deg2rad(self.rotation))])
-    turret_offset = - tank_front * self.turret_offset[0]
-    turret_rect = self.turret_image.get_rect(center=self.rect.center + turret_offset)
-    screen.blit(self.turret_image, turret_rect)
+    turret_offset = - tank_front * self.turret_offset[0] * scale
+    turret_rect = turret_image.get_rect(center=center + turret_offset)
+    screen.blit(turret_image, turret_rect)
     # move and rotate cannon
-    cannon_offset = np.array([np.cos(np.deg2rad(self.turret_rotation)), -np.sin(np.deg2rad(self.turret_rotation))]) * self.turret_radius
-    rotated_cannon_rect = rotated_cannon_image.get_rect(center=self.rect.center + cannon_offset + turret_offset)
+    cannon_offset = np.array([np.cos(np.deg2rad(self.turret_rotation)), -np.sin(np.deg2rad(self.turret_rotation))]) * self.turret_radius * scale
+    rotated_cannon_rect = rotated_cannon_image.get_rect(center=center + cannon_offset + turret_offset)
     screen.blit(rotated_cannon_image, rotated_cannon_rect)
 
-    # calculate health bar position and width
-    health_bar_width = int(self.health / self.max_health * self.tank_length)
-    health_bar_left = int(self.rect.centerx - self.tank_length / 2)
+    # calculate health bar size, position and width, scaled to the screen
+    bar_length = int(self.tank_length * scale)
+    bar_height = int(self.health_bar_height * scale)
+    health_bar_width = int(self.health / self.max_health * bar_length)
+    health_bar_left = int(center[0] - bar_length / 2)
     
     # create health bar surface
-    self.health_bar = pygame.Surface((self.tank_length, self.health_bar_height), pygame.SRCALPHA)
+    self.health_bar = pygame.Surface((bar_length, bar_height), pygame.SRCALPHA)
 
     
     # draw health bar background
-    pygame.draw.rect(self.health_bar, pygame.Color("#cccccc"), (0, 0, self.tank_length, self.health_bar_height))
+    pygame.draw.rect(self.health_bar, pygame.Color("#cccccc"), (0, 0, bar_length, bar_height))
     
     # draw health bar fill
     if self.health / self.max_health < 0.3:
-        self.health_bar.fill(pygame.Color("#cc0000"), (0, 0, health_bar_width, self.health_bar_height))
+        self.health_bar.fill(pygame.Color("#cc0000"), (0, 0, health_bar_width, bar_height))
     elif self.health / self.max_health < 0.6:
-        self.health_bar.fill(pygame.Color("#cc8800"), (0, 0, health_bar_width, self.health_bar_height))
+        self.health_bar.fill(pygame.Color("#cc8800"), (0, 0, health_bar_width, bar_height))
     else:
         self.health_bar.fill(pygame.Color("#00aa00"), (0, 0, health_bar_width,107))
     
     # draw health bar border
-    pygame.draw.rect(self.health_bar, pygame.Color("#000000"), (0, 0, self.tank_length, self.health_bar_height + 2), 2)
+    pygame.draw.rect(self.health_bar, pygame.Color("#000000"), (0, 0, bar_length, bar_height + 2), max(1, round(2 * scale)))
     
     # draw health bar
-    screen.blit(self.health_bar, (health_bar_left, self.rect.top - self.health_bar_height - self.health_bar_y_offset))
\ No newline at end of file
+    screen.blit(self.health_bar, (health_bar_left, (self.rect.top - self.health_bar_height - self.health_bar_y_offset) * scale))
\ No newline at end of file